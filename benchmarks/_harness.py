@@ -0,0 +1,110 @@
+"""Shared helpers for the benchmark scripts: run the coordinator against local stand-ins.
+
+A real HomeAssistant core object is created (no integrations loaded) and cloud
+traffic is served by the request.py replay transport, so nothing here needs
+network access.
+"""
+
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'custom_components'))
+
+from homeassistant.core import HomeAssistant  # noqa: E402
+
+from ha_hitachi.const import (  # noqa: E402
+    DOMAIN, KEY_CODE, KEY_NAME, KEY_HEAT_MAX, KEY_HEAT_MIN, KEY_COLD_MAX, KEY_COLD_MIN,
+    KEY_MAC, KEY_HOME_ID, KEY_XKQ_TYPE, KEY_STATE, KEY_TARGET_TEMP, KEY_MODE, KEY_ECO,
+    KEY_SILENT, KEY_DRY_FLOOR, KEY_LOCK, KEY_OUTLET_TEMP, KEY_INLET_TEMP, KEY_CUR_TEMP,
+    KEY_KEY_TONE, KEY_LED_BRIGHT, KEY_SCREEN_BRIGHT,
+)
+from ha_hitachi.coordinator import Coordinator  # noqa: E402
+
+STATUS_KEYS = (
+    KEY_STATE, KEY_TARGET_TEMP, KEY_MODE, KEY_ECO, KEY_SILENT, KEY_DRY_FLOOR, KEY_LOCK,
+    KEY_OUTLET_TEMP, KEY_INLET_TEMP, KEY_CUR_TEMP, KEY_KEY_TONE, KEY_LED_BRIGHT, KEY_SCREEN_BRIGHT,
+)
+
+
+class NoOutbox:
+    """Outbox stand-in, the benchmarks never send commands."""
+
+    depth = 0
+
+    def pop(self, home_id, xkq_code):
+        return {}
+
+    def put(self, device_info, cmd_dict):
+        pass
+
+    def retry_now(self):
+        pass
+
+
+def xkq_code(home_id, i):
+    return f'XKQ{home_id:03d}{i:03d}'
+
+
+def status_item(code, poll=0):
+    status = {KEY_CODE: code, **{key: 0 for key in STATUS_KEYS}}
+    status[KEY_STATE] = 1
+    status[KEY_MODE] = 1
+    status[KEY_CUR_TEMP] = 20 + poll % 5
+    status[KEY_OUTLET_TEMP] = 35
+    status[KEY_INLET_TEMP] = 30
+    return status
+
+
+def discovered_xkq(code, name, mac):
+    """A controller as listed by home discovery."""
+    return {
+        KEY_CODE: code,
+        KEY_NAME: name,
+        KEY_HEAT_MAX: 30, KEY_HEAT_MIN: 16, KEY_COLD_MAX: 30, KEY_COLD_MIN: 16,
+        KEY_MAC: mac,
+        'type': 1,
+        KEY_XKQ_TYPE: 1,
+    }
+
+
+def exchange(t, method, url, res):
+    """A recording entry, the response kept as body text like the recorder writes it."""
+    return {'t': t, 'm': method, 'u': url, 'q': None, 'b': json.dumps(res, separators=(',', ':'))}
+
+
+def write_recording(path, homes=2, per_home=10, polls=10):
+    """Write a synthetic recording: login, home discovery and `polls` status polls."""
+    entries = [exchange(0, 'POST', 'login', {
+        'code': '200',
+        'data': {
+            'user': {'token': 'token', 'refreshToken': 'refresh'},
+            'homeList': [{KEY_HOME_ID: h, 'homeName': f'home {h}'} for h in range(1, homes + 1)],
+        },
+    })]
+    for h in range(1, homes + 1):
+        entries.append(exchange(0, 'GET', f'api/apphome/homes/{h}', {
+            'code': '200',
+            'data': {'homeDetail': {'xkqList': [
+                discovered_xkq(xkq_code(h, i), f'room {i}', f'mac{h:03d}{i:03d}') for i in range(per_home)
+            ]}},
+        }))
+    for poll in range(polls):
+        for h in range(1, homes + 1):
+            entries.append(exchange(10 * (poll + 1), 'POST', f'api/appstatus/homes/{h}/status', {
+                'code': '200',
+                'data': {'xkqStatusList': [status_item(xkq_code(h, i), poll) for i in range(per_home)]},
+            }))
+    with open(path, 'w', encoding='utf-8') as f:
+        for entry in entries:
+            f.write(json.dumps(entry, separators=(',', ':')) + '\n')
+
+
+async def async_hass(config_dir) -> HomeAssistant:
+    hass = HomeAssistant(str(config_dir))
+    hass.data[DOMAIN] = {}
+    return hass
+
+
+def make_coordinator(hass: HomeAssistant) -> Coordinator:
+    return Coordinator(hass, 'user', 'password', '', '', NoOutbox())
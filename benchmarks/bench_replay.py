@@ -0,0 +1,118 @@
+"""Coordinator poll cost against recorded cloud traffic.
+
+Replays a recording made with the hitachi.record service (or a synthetic one
+when no path is given) through the request.py replay transport, then times
+discovery and every Coordinator._async_update_data call: wall latency and CPU
+time spent in this process, i.e. request serialization, decoding the recorded
+body text, merging and snapshot building.
+
+Recordings started on a running instance usually begin mid-session and hold
+only status polls; login and home discovery responses are synthesized from the
+recorded status lists in that case.
+
+Run from the repository root:
+
+    python benchmarks/bench_replay.py [recording.jsonl]
+"""
+
+import asyncio
+import json
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from _harness import async_hass, discovered_xkq, exchange, make_coordinator, write_recording
+
+from ha_hitachi import request
+from ha_hitachi.const import KEY_CODE, KEY_HOME_ID
+
+STATUS_PREFIX = 'api/appstatus/homes/'
+
+
+def _with_discovery(src, dst):
+    """Copy src to dst, adding login and home responses when src has none."""
+    with open(src, encoding='utf-8') as f:
+        entries = [json.loads(line) for line in f if line.strip()]
+    if not any(e['u'] == 'login' for e in entries):
+        homes = {}
+        for e in entries:
+            if e['m'] == 'POST' and e['u'].startswith(STATUS_PREFIX):
+                # api/appstatus/homes/{home_id}/status
+                codes = homes.setdefault(e['u'].split('/')[3], {})
+                for xkq in json.loads(e['b'])['data']['xkqStatusList']:
+                    codes[xkq[KEY_CODE]] = None
+        discovery = [exchange(0, 'POST', 'login', {
+            'code': '200',
+            'data': {
+                'user': {'token': 'token', 'refreshToken': 'refresh'},
+                'homeList': [{KEY_HOME_ID: int(h), 'homeName': f'home {h}'} for h in homes],
+            },
+        })]
+        for h, codes in homes.items():
+            discovery.append(exchange(0, 'GET', f'api/apphome/homes/{h}', {
+                'code': '200',
+                'data': {'homeDetail': {'xkqList': [
+                    discovered_xkq(code, f'room {i}', f'mac{h}{i:03d}')
+                    for i, code in enumerate(codes)
+                ]}},
+            }))
+        entries = discovery + entries
+    with open(dst, 'w', encoding='utf-8') as f:
+        for entry in entries:
+            f.write(json.dumps(entry, ensure_ascii=False, separators=(',', ':')) + '\n')
+    return sum(1 for e in entries if e['u'].startswith(STATUS_PREFIX))
+
+
+def _stats(name, values):
+    ms = sorted(v * 1000 for v in values)
+    p95 = ms[min(len(ms) - 1, round(len(ms) * 0.95))]
+    print(f'{name:<14}{statistics.mean(ms):>10.2f}{p95:>10.2f}{ms[-1]:>10.2f}')
+
+
+async def _run(path, tmp):
+    replay = Path(tmp) / 'replay.jsonl'
+    status_calls = _with_discovery(path, replay)
+    hass = await async_hass(tmp)
+    request.set_replay(str(replay), speed=0)
+    coordinator = make_coordinator(hass)
+
+    start = time.perf_counter()
+    await coordinator.async_discover()
+    discover = time.perf_counter() - start
+    homes = len(coordinator.get_devices())
+    polls = status_calls // homes if homes else 0
+
+    latency = []
+    cpu = []
+    for _ in range(polls):
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        await coordinator._async_update_data()
+        cpu.append(time.process_time() - cpu_start)
+        latency.append(time.perf_counter() - wall_start)
+    request.set_replay(None)
+
+    controllers = sum(len(home['xkqList']) for home in coordinator.get_devices().values())
+    print(f'{homes} homes, {controllers} controllers, {polls} polls replayed, '
+          f'discovery {discover * 1000:.1f} ms')
+    if not polls:
+        return
+    print(f'{"per poll":<14}{"mean ms":>10}{"p95 ms":>10}{"max ms":>10}')
+    _stats('latency', latency)
+    _stats('cpu', cpu)
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        if len(sys.argv) > 1:
+            path = sys.argv[1]
+        else:
+            path = Path(tmp) / 'synthetic.jsonl'
+            write_recording(path, homes=2, per_home=10, polls=50)
+        asyncio.run(_run(path, tmp))
+
+
+if __name__ == '__main__':
+    main()
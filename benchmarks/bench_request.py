@@ -0,0 +1,95 @@
+"""Per-poll request preparation cost: rebuilt headers/body + generic JSON vs the prepared layer.
+
+Run from the repository root:
+
+    python benchmarks/bench_request.py [homes] [controllers per home]
+"""
+
+import json
+import sys
+import time
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'custom_components'))
+
+from ha_hitachi import request  # noqa: E402
+from ha_hitachi.const import (  # noqa: E402
+    KEY_CODE, KEY_TS, KEY_STATE, KEY_TARGET_TEMP, KEY_MODE, KEY_ECO, KEY_SILENT,
+    KEY_DRY_FLOOR, KEY_LOCK, KEY_OUTLET_TEMP, KEY_INLET_TEMP, KEY_CUR_TEMP,
+    KEY_KEY_TONE, KEY_LED_BRIGHT, KEY_SCREEN_BRIGHT,
+)
+
+STATUS_KEYS = (
+    KEY_STATE, KEY_TARGET_TEMP, KEY_MODE, KEY_ECO, KEY_SILENT, KEY_DRY_FLOOR, KEY_LOCK,
+    KEY_OUTLET_TEMP, KEY_INLET_TEMP, KEY_CUR_TEMP, KEY_KEY_TONE, KEY_LED_BRIGHT, KEY_SCREEN_BRIGHT,
+)
+
+
+def _old_headers(token):
+    return {
+        'host': '1app.hicloud.hisensehitachi.com',
+        'accept-charset': 'UTF-8',
+        'authorization': (f'Bearer {token}').strip(),
+        'x-his-locale': 'zh_CN',
+        'x-his-apikey': '1QiLCJhbGciOiJIUzI1NiJ9',
+        'x-his-timestamp': f'{int(time.time()*1000)}',
+        'x-his-appid': 'com.hisensehitachi.iez2',
+        'x-his-os': 'Android',
+        'x-his-version': '7.2.0.240618_release',
+        'content-type': 'application/json',
+        'x-his-apptag': 'V3',
+        'user-agent': 'Dalvik/2.1.0 (Linux; U; Android 12; V2304A Build/W528JS)',
+        'accept-encoding': 'gzip',
+    }
+
+
+def main():
+    homes = int(sys.argv[1]) if len(sys.argv) > 1 else 2
+    per_home = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    topology = {
+        home_id: tuple(f'XKQ{home_id:03d}{i:03d}' for i in range(per_home))
+        for home_id in range(1, homes + 1)
+    }
+    responses = {
+        home_id: json.dumps({'code': '200', 'data': {'xkqStatusList': [
+            {KEY_CODE: code, **{key: 1 for key in STATUS_KEYS}} for code in codes
+        ]}}).encode()
+        for home_id, codes in topology.items()
+    }
+    request.set_token('x' * 160)
+
+    def before():
+        for home_id, codes in topology.items():
+            _old_headers(request._token)
+            body = json.dumps({
+                'boxList': [],
+                'deviceListGjy': [],
+                'iuIdList': [],
+                'iuIdListGjy': [],
+                'noNetTip': True,
+                'xkqListGjy': [],
+                'homeId': int(home_id),
+                'xkqList': [{KEY_TS: 0, KEY_CODE: code} for code in codes],
+            }).encode()
+            json.loads(responses[home_id])
+
+    def after():
+        for home_id, codes in topology.items():
+            request._gen_headers()
+            request._status_request(home_id, codes)
+            request._loads(responses[home_id])
+
+    number = 2000
+    results = {}
+    for name, fn in (('before', before), ('after', after)):
+        results[name] = min(timeit.repeat(fn, number=number, repeat=5)) / number * 1e6
+    print(f'{homes} homes x {per_home} controllers, json backend: {request._loads.__module__}')
+    for name, us in results.items():
+        print(f'{name:<8}{us:>10.1f} us/poll')
+    print(f'saving  {results["before"] - results["after"]:>10.1f} us/poll '
+          f'({1 - results["after"] / results["before"]:.0%})')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""Integration startup cost with budget checks.
+
+Imports the integration in a fresh interpreter, after the Home Assistant modules
+the integration depends on are already loaded (as they are in a running
+instance), and fails when the median exceeds IMPORT_BUDGET_MS.
+
+Auth, discovery and the first poll are then run against a synthetic recording
+through the request.py replay transport without delays, so only the time spent
+in this process is measured, and each phase median is checked against
+PHASE_BUDGETS_MS. Entity add needs a running Home Assistant with the platforms
+loaded and is not checked here; it is recorded by the integration itself and
+shown under "startup" in its diagnostics.
+
+Run from the repository root:
+
+    python benchmarks/bench_startup.py [runs]
+"""
+
+import asyncio
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from _harness import async_hass, make_coordinator, write_recording
+
+from ha_hitachi import request
+
+IMPORT_BUDGET_MS = 150
+PHASE_BUDGETS_MS = {
+    'auth': 20,
+    'discovery': 50,
+    'first_poll': 50,
+}
+# topology of the synthetic account
+HOMES = 2
+PER_HOME = 10
+
+CUSTOM_COMPONENTS = Path(__file__).resolve().parents[1] / 'custom_components'
+
+_PROBE = f'''
+import sys, time
+sys.path.insert(0, {str(CUSTOM_COMPONENTS)!r})
+import voluptuous
+import homeassistant.core
+import homeassistant.config_entries
+import homeassistant.helpers.update_coordinator
+import homeassistant.helpers.storage
+import homeassistant.helpers.event
+start = time.perf_counter()
+import ha_hitachi
+elapsed = time.perf_counter() - start
+print(elapsed * 1000)
+'''
+
+
+def _import_samples(runs):
+    samples = []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, '-c', _PROBE], check=True, capture_output=True, text=True)
+        samples.append(float(out.stdout))
+    return samples
+
+
+async def _phase_samples(runs, tmp):
+    recording = Path(tmp) / 'startup.jsonl'
+    write_recording(recording, homes=HOMES, per_home=PER_HOME, polls=1)
+    hass = await async_hass(tmp)
+    samples = {phase: [] for phase in PHASE_BUDGETS_MS}
+    for _ in range(runs):
+        request.set_replay(str(recording), speed=0)
+        coordinator = make_coordinator(hass)
+        await coordinator.async_discover()
+        start = time.monotonic()
+        await coordinator._async_update_data()
+        coordinator.startup['first_poll'] = time.monotonic() - start
+        for phase, values in samples.items():
+            values.append(coordinator.startup[phase] * 1000)
+    request.set_replay(None)
+    return samples
+
+
+def _check(name, samples, budget):
+    median = statistics.median(samples)
+    print(f'{name:<18}median {median:>7.1f} ms, min {min(samples):>7.1f} ms (budget {budget} ms)')
+    return median <= budget
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    print(f'{runs} runs, {HOMES} homes x {PER_HOME} controllers')
+    ok = _check('import ha_hitachi', _import_samples(runs), IMPORT_BUDGET_MS)
+    with tempfile.TemporaryDirectory() as tmp:
+        phases = asyncio.run(_phase_samples(runs, tmp))
+    for phase, samples in phases.items():
+        ok = _check(phase, samples, PHASE_BUDGETS_MS[phase]) and ok
+    if not ok:
+        print('FAIL: startup over budget')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
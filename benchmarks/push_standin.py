@@ -0,0 +1,106 @@
+"""Local stand-in for the push relay.
+
+    python benchmarks/push_standin.py serve [port]
+
+accepts listener connections and forwards every JSON line read from stdin to
+them, for trying a running instance configured with tcp://<host>:<port>.
+
+    python benchmarks/push_standin.py check
+
+starts the stand-in on a free port, points a PushListener at it, sends a few
+malformed lines followed by a status update, and fails unless the update
+reaches the coordinator snapshot.
+"""
+
+import asyncio
+import json
+import sys
+import tempfile
+
+from _harness import async_hass, make_coordinator, write_recording, xkq_code
+
+from ha_hitachi import request
+from ha_hitachi.const import KEY_CODE, KEY_CUR_TEMP
+from ha_hitachi.push import PushListener
+
+
+class StandIn:
+
+    def __init__(self):
+        self._writers = set()
+        self._handlers = set()
+        self.connected = asyncio.Event()
+
+    async def _handle(self, reader, writer):
+        self._writers.add(writer)
+        self._handlers.add(asyncio.current_task())
+        self.connected.set()
+        try:
+            await reader.read()
+        finally:
+            self._writers.discard(writer)
+
+    async def start(self, port=0):
+        server = await asyncio.start_server(self._handle, '127.0.0.1', port)
+        return server, server.sockets[0].getsockname()[1]
+
+    async def aclose(self):
+        for writer in self._writers:
+            writer.close()
+        await asyncio.gather(*self._handlers, return_exceptions=True)
+
+    async def send(self, line: bytes):
+        for writer in list(self._writers):
+            writer.write(line.rstrip(b'\n') + b'\n')
+            await writer.drain()
+
+
+async def serve(port):
+    stand_in = StandIn()
+    server, port = await stand_in.start(port)
+    print(f'push stand-in listening on tcp://127.0.0.1:{port}, send JSON lines on stdin')
+    loop = asyncio.get_running_loop()
+    async with server:
+        while line := await loop.run_in_executor(None, sys.stdin.buffer.readline):
+            await stand_in.send(line)
+
+
+async def check():
+    with tempfile.TemporaryDirectory() as tmp:
+        write_recording(f'{tmp}/recording.jsonl', homes=1, per_home=2, polls=0)
+        request.set_replay(f'{tmp}/recording.jsonl', speed=0)
+        hass = await async_hass(tmp)
+        coordinator = make_coordinator(hass)
+        await coordinator.async_discover()
+
+        stand_in = StandIn()
+        server, port = await stand_in.start()
+        listener = PushListener(hass, coordinator, f'tcp://127.0.0.1:{port}')
+        listener.start()
+        await asyncio.wait_for(stand_in.connected.wait(), 5)
+
+        code = xkq_code(1, 1)
+        for line in (b'not json', b'{"homeId": 1}', b'{"homeId": 1, "xkqStatusList": [1, {"x": 2}]}'):
+            await stand_in.send(line)
+        await stand_in.send(json.dumps({'homeId': 1, 'xkqStatusList': [{KEY_CODE: code, KEY_CUR_TEMP: 27.5}]}).encode())
+        for _ in range(50):
+            dev = coordinator.get_data(1, code)
+            if dev is not None and dev.get(KEY_CUR_TEMP) == 27.5:
+                break
+            await asyncio.sleep(0.05)
+        ok = coordinator.get_data(1, code).get(KEY_CUR_TEMP) == 27.5
+        await listener.async_stop()
+        await stand_in.aclose()
+        server.close()
+        await server.wait_closed()
+        await hass.async_stop(force=True)
+    print('push stand-in check:', 'OK' if ok else 'FAIL')
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == 'serve':
+        asyncio.run(serve(int(sys.argv[2]) if len(sys.argv) > 2 else 9000))
+    else:
+        asyncio.run(check())
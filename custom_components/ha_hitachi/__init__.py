@@ -1,21 +1,43 @@
 """init"""
 
+import time
+_import_start = time.perf_counter()
+
+import asyncio
 import logging
 from dataclasses import dataclass
-from homeassistant.config_entries import ConfigEntry
+from functools import partial
+
+import voluptuous as vol
+import homeassistant.helpers.config_validation as cv
+from homeassistant.helpers import device_registry as dr
+from homeassistant.config_entries import ConfigEntry, ConfigEntryState
 from homeassistant.const import CONF_USERNAME, CONF_PASSWORD, CONF_TOKEN, Platform
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, ServiceCall
+from homeassistant.exceptions import ConfigEntryAuthFailed, ConfigEntryNotReady, HomeAssistantError
 
-from .const import DOMAIN, CONF_REFRESH_TOKEN
+from .const import (
+    DOMAIN, CONF_REFRESH_TOKEN, CONF_EXCLUDE, CONF_POLL_RARELY,
+    CONF_OUTBOX_MAX_AGE, DEFAULT_OUTBOX_MAX_AGE,
+    SERVICE_PROFILE, ATTR_POLLS, SERVICE_RECORD, ATTR_ENABLED,
+)
 # from .hit_ctrl import HitCtrl
 from .coordinator import Coordinator
+from .push import PushListener, entry_push_url
+from .outbox import CommandOutbox, async_remove_store
+from .tracing import Tracer
+from . import profiler
+from .request import set_recorder
 
 
 PLATFORMS = [Platform.SENSOR, Platform.SWITCH, Platform.CLIMATE]
 
+_import_time = time.perf_counter() - _import_start
+
 @dataclass
 class HitachiData:
     coordinator: Coordinator
+    outbox: CommandOutbox
 
 
 type HitachiConfigEntry = ConfigEntry[HitachiData]
@@ -28,6 +50,54 @@ def _log(s: str):
     for i in s.split("\n"):
         _LOGGER.debug(i)
 
+PROFILE_SCHEMA = vol.Schema({
+    vol.Optional(ATTR_POLLS, default=10): vol.All(vol.Coerce(int), vol.Range(min=1, max=100)),
+})
+
+async def _async_profile(hass: HomeAssistant, call: ServiceCall):
+    if not profiler.start(call.data[ATTR_POLLS]):
+        raise HomeAssistantError('a profiled poll is still running, try again shortly')
+    for entry in hass.config_entries.async_entries(DOMAIN):
+        # runtime_data outlives an unload
+        if entry.state is ConfigEntryState.LOADED:
+            await entry.runtime_data.coordinator.async_request_refresh()
+
+RECORD_SCHEMA = vol.Schema({
+    vol.Optional(ATTR_ENABLED, default=True): cv.boolean,
+})
+
+async def _async_record(hass: HomeAssistant, call: ServiceCall):
+    if not call.data[ATTR_ENABLED]:
+        set_recorder(None)
+        _LOGGER.info('stopped recording API traffic')
+        return
+    path = hass.config.path(f'hitachi_record_{int(time.time())}.jsonl')
+    set_recorder(path)
+    _LOGGER.info('recording API traffic to %s', path)
+
+def _remove_excluded_devices(hass: HomeAssistant, entry: HitachiConfigEntry, coordinator: Coordinator):
+    """Detach devices of excluded homes and controllers, their entities go with them."""
+    device_registry = dr.async_get(hass)
+    for identifier in coordinator.excluded_device_ids():
+        if device := device_registry.async_get_device(identifiers={(DOMAIN, identifier)}):
+            device_registry.async_update_device(device.id, remove_config_entry_id=entry.entry_id)
+
+async def _async_unload_loaded_platforms(hass: HomeAssistant, entry: HitachiConfigEntry):
+    """Unload the platforms of a failed setup, entity add may have stopped partway."""
+    for platform in PLATFORMS:
+        try:
+            await hass.config_entries.async_forward_entry_unload(entry, platform)
+        except ValueError:
+            # this platform was never set up for the entry
+            pass
+
+async def _timed(coordinator: Coordinator, phase: str, aw):
+    start = time.monotonic()
+    try:
+        return await aw
+    finally:
+        coordinator.startup[phase] = time.monotonic() - start
+
 async def async_setup_entry(
         hass: HomeAssistant, entry: HitachiConfigEntry
 ):
@@ -37,9 +107,64 @@ async def async_setup_entry(
     token = entry.data[CONF_TOKEN]
     refresh_token = entry.data[CONF_REFRESH_TOKEN]
 
-    coordinator = Coordinator(hass, username, password, token, refresh_token)
-    entry.runtime_data = HitachiData(coordinator=coordinator)
-    await coordinator.async_config_entry_first_refresh()
-    await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+    # one trace per entry, so diagnostics never show another account's exchanges
+    tracer = Tracer()
+    outbox = CommandOutbox(
+        hass, entry.entry_id, entry.options.get(CONF_OUTBOX_MAX_AGE, DEFAULT_OUTBOX_MAX_AGE),
+        tracer=tracer,
+    )
+    await outbox.async_load()
+    entry.async_on_unload(outbox.async_shutdown)
+    coordinator = Coordinator(
+        hass, username, password, token, refresh_token, outbox,
+        exclude=entry.options.get(CONF_EXCLUDE, []),
+        poll_rarely=entry.options.get(CONF_POLL_RARELY, []),
+        tracer=tracer,
+    )
+    entry.runtime_data = HitachiData(coordinator=coordinator, outbox=outbox)
+    coordinator.startup['import'] = _import_time
+
+    try:
+        await coordinator.async_discover()
+    except ConfigEntryAuthFailed:
+        raise
+    except Exception as err:
+        raise ConfigEntryNotReady(f"Error communicating with API: {err}") from err
+    _remove_excluded_devices(hass, entry, coordinator)
+
+    # entities only need the discovered topology, add them while the first status fetch runs
+    first_poll, entity_add = await asyncio.gather(
+        _timed(coordinator, 'first_poll', coordinator.async_config_entry_first_refresh()),
+        _timed(coordinator, 'entity_add', hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)),
+        return_exceptions=True,
+    )
+    for err in (first_poll, entity_add):
+        if isinstance(err, BaseException):
+            await _async_unload_loaded_platforms(hass, entry)
+            raise err
+    _LOGGER.debug('startup phases: %s', coordinator.startup)
+
+    if push_url := entry_push_url(entry):
+        listener = PushListener(hass, coordinator, push_url)
+        listener.start()
+        entry.async_on_unload(listener.async_stop)
+    if not hass.services.has_service(DOMAIN, SERVICE_PROFILE):
+        hass.services.async_register(
+            DOMAIN, SERVICE_PROFILE, partial(_async_profile, hass), schema=PROFILE_SCHEMA
+        )
+    if not hass.services.has_service(DOMAIN, SERVICE_RECORD):
+        hass.services.async_register(
+            DOMAIN, SERVICE_RECORD, partial(_async_record, hass), schema=RECORD_SCHEMA
+        )
+    entry.async_on_unload(entry.add_update_listener(_async_update_listener))
     _LOGGER.debug('async_setup_entry finished')
     return True
+
+async def _async_update_listener(hass: HomeAssistant, entry: HitachiConfigEntry):
+    await hass.config_entries.async_reload(entry.entry_id)
+
+async def async_unload_entry(hass: HomeAssistant, entry: HitachiConfigEntry) -> bool:
+    return await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
+
+async def async_remove_entry(hass: HomeAssistant, entry: HitachiConfigEntry) -> None:
+    await async_remove_store(hass, entry.entry_id)
\ No newline at end of file
@@ -22,8 +22,7 @@ from .const import (
     ModeEnum
 )
 
-from .const import DOMAIN, CONF_REFRESH_TOKEN
-from .request import refresh_auth, req_homes, req_status
+from .const import DOMAIN
 
 
 _LOGGER = logging.getLogger(__name__)
@@ -71,7 +70,6 @@ async def async_setup_entry(
 
     devices = coordinator.get_devices()
     entities = []
-    _LOGGER.debug(devices)
     home_ids = list(devices.keys())
     for home_id in home_ids:
         xkq_devices = devices[home_id]['xkqList']
@@ -96,6 +94,8 @@ class HitachiClimate(CoordinatorEntity[Coordinator], ClimateEntity):
         self._coordinator = coordinator
         self._home_id = home_id
         self._xkq_code = xkq_code
+        self._dev = None
+        self._last_update_success = coordinator.last_update_success
 
         dev = self._coordinator.get_data(
             self._home_id, self._xkq_code
@@ -133,15 +133,15 @@ class HitachiClimate(CoordinatorEntity[Coordinator], ClimateEntity):
             self._attr_hvac_mode = hvac_mode
             payload.update(_gen_payload(hvac_mode))
 
-        res = await self._coordinator.control(self._home_id, self._xkq_code, payload)
-        _LOGGER.debug(res)
+        await self._coordinator.control(self._home_id, self._xkq_code, payload)
+        # drop the optimistic values on the next update even if the record is unchanged
+        self._dev = None
         await self._coordinator.async_refresh()
 
 
     async def async_set_hvac_mode(self, hvac_mode: HVACMode) -> None:
         """Set new operation mode."""
-        res = await self._coordinator.control(self._home_id, self._xkq_code, _gen_payload(hvac_mode))
-        _LOGGER.debug(res)
+        await self._coordinator.control(self._home_id, self._xkq_code, _gen_payload(hvac_mode))
         await self._coordinator.async_refresh()
     
     async def async_turn_on(self) -> None:
@@ -151,7 +151,7 @@ class HitachiClimate(CoordinatorEntity[Coordinator], ClimateEntity):
             self._home_id, self._xkq_code
         )
         if dev:
-            mode = _get_mode(1, dev[KEY_MODE])
+            mode = _get_mode(1, dev.get(KEY_MODE))
             await self.async_set_hvac_mode(mode)
 
     async def async_turn_off(self) -> None:
@@ -162,14 +162,30 @@ class HitachiClimate(CoordinatorEntity[Coordinator], ClimateEntity):
     @callback
     def _handle_coordinator_update(self) -> None:
         """Handle data update."""
+        # snapshots replace changed records, an identical record means nothing to render
+        if (self._coordinator.get_data(self._home_id, self._xkq_code) is self._dev
+                and self._coordinator.last_update_success == self._last_update_success):
+            self._coordinator.skip_write()
+            return
+        self._last_update_success = self._coordinator.last_update_success
         self._update_state()
-        self.async_write_ha_state()
+        self._coordinator.schedule_write(self)
+
+    @property
+    def rendered_attrs(self) -> tuple:
+        """Values _update_state sets besides the state, compared before a batched write."""
+        return (
+            self._attr_target_temperature, self._attr_current_temperature,
+            getattr(self, '_attr_min_temp', None), getattr(self, '_attr_max_temp', None),
+        )
 
     def _update_state(self):
         dev = self._coordinator.get_data(
             self._home_id, self._xkq_code
         )
-        if dev:
+        self._dev = dev
+        # platforms are set up while the first poll is still running
+        if dev and KEY_STATE in dev:
             self._attr_target_temperature = dev[KEY_TARGET_TEMP]
             self._attr_current_temperature = dev[KEY_CUR_TEMP]
             self._attr_hvac_mode = _get_mode(dev[KEY_STATE], dev[KEY_MODE])
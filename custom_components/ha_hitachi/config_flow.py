@@ -5,13 +5,19 @@ from typing import Any
 
 import voluptuous as vol
 from homeassistant import config_entries
-from homeassistant.config_entries import ConfigEntry
+from homeassistant.config_entries import ConfigEntry, ConfigEntryState
 from homeassistant.const import CONF_USERNAME, CONF_PASSWORD, CONF_TOKEN
 from homeassistant.core import callback, HomeAssistant
 from homeassistant.data_entry_flow import FlowResult
+import homeassistant.helpers.config_validation as cv
 
-from .const import DOMAIN, CONF_REFRESH_TOKEN
+from .const import (
+    DOMAIN, CONF_REFRESH_TOKEN, CONF_PUSH_URL, CONF_EXCLUDE, CONF_POLL_RARELY,
+    CONF_OUTBOX_MAX_AGE, DEFAULT_OUTBOX_MAX_AGE,
+)
+from .coordinator import selection_id
 from .request import refresh_auth
+from .push import parse_push_url, entry_push_url
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -28,6 +34,11 @@ class HitachiHandler(config_entries.ConfigFlow, domain=DOMAIN):
     def __init__(self):
         self.user_input = {}
 
+    @staticmethod
+    @callback
+    def async_get_options_flow(config_entry: ConfigEntry) -> HitachiOptionsFlow:
+        return HitachiOptionsFlow(config_entry)
+
     async def async_step_user(
             self, user_input: dict[str, Any] | None = None
     ) -> FlowResult:
@@ -35,9 +46,14 @@ class HitachiHandler(config_entries.ConfigFlow, domain=DOMAIN):
         _LOGGER.debug('async_step_user')
         if user_input is not None:
             self.user_input.update(user_input)
+            if push_url := self.user_input.get(CONF_PUSH_URL):
+                try:
+                    parse_push_url(push_url)
+                except ValueError:
+                    errors = { CONF_PUSH_URL: 'invalid_push_url' }
+        if user_input is not None and not errors:
             _LOGGER.debug('Authing...')
             res = await refresh_auth(self.user_input[CONF_USERNAME], self.user_input[CONF_PASSWORD])
-            _LOGGER.debug(res)
             if res is not None:
                 self.user_input[CONF_TOKEN], self.user_input[CONF_REFRESH_TOKEN], _ = res
                 return self.async_create_entry(title=self.user_input[CONF_USERNAME], data=self.user_input)
@@ -49,5 +65,56 @@ class HitachiHandler(config_entries.ConfigFlow, domain=DOMAIN):
             data_schema=vol.Schema({
                 vol.Required(CONF_USERNAME): str,
                 vol.Required(CONF_PASSWORD): str,
+                vol.Optional(CONF_PUSH_URL): str,
+            }), errors=errors
+        )
+
+
+class HitachiOptionsFlow(config_entries.OptionsFlow):
+    """Choose which homes and controllers are polled, and which only rarely, and the push relay."""
+
+    def __init__(self, config_entry: ConfigEntry):
+        self._entry = config_entry
+
+    async def async_step_init(
+            self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        errors = {}
+        if user_input is not None:
+            if push_url := user_input.get(CONF_PUSH_URL):
+                try:
+                    parse_push_url(push_url)
+                except ValueError:
+                    errors = { CONF_PUSH_URL: 'invalid_push_url' }
+            if not errors:
+                return self.async_create_entry(title='', data=user_input)
+
+        if self._entry.state is not ConfigEntryState.LOADED:
+            return self.async_abort(reason='not_loaded')
+        data = self._entry.runtime_data
+
+        choices = {}
+        for home_id, (home_name, xkqs) in data.coordinator.get_topology().items():
+            choices[selection_id(home_id)] = home_name
+            for xkq_code, xkq_name in xkqs:
+                choices[selection_id(home_id, xkq_code)] = f'{home_name} / {xkq_name}'
+
+        # keep the submitted choices when the form is shown again with an error
+        options = {**self._entry.options, **(user_input or {})}
+        push_url = entry_push_url(self._entry) if user_input is None else user_input.get(CONF_PUSH_URL)
+        return self.async_show_form(
+            step_id="init",
+            data_schema=vol.Schema({
+                vol.Optional(CONF_EXCLUDE, default=[
+                    i for i in options.get(CONF_EXCLUDE, []) if i in choices
+                ]): cv.multi_select(choices),
+                vol.Optional(CONF_POLL_RARELY, default=[
+                    i for i in options.get(CONF_POLL_RARELY, []) if i in choices
+                ]): cv.multi_select(choices),
+                vol.Optional(CONF_OUTBOX_MAX_AGE, default=options.get(
+                    CONF_OUTBOX_MAX_AGE, DEFAULT_OUTBOX_MAX_AGE
+                )): vol.All(vol.Coerce(int), vol.Range(min=1, max=1440)),
+                # suggested rather than default, so clearing the field turns push off
+                vol.Optional(CONF_PUSH_URL, description={'suggested_value': push_url}): str,
             }), errors=errors
         )
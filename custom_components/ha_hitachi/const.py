@@ -2,6 +2,17 @@ from enum import IntEnum, StrEnum
 
 DOMAIN = 'hitachi'
 CONF_REFRESH_TOKEN = 'refresh_token'
+CONF_PUSH_URL = 'push_url'
+CONF_EXCLUDE = 'exclude'
+CONF_POLL_RARELY = 'poll_rarely'
+CONF_OUTBOX_MAX_AGE = 'outbox_max_age'
+# minutes a queued command stays valid
+DEFAULT_OUTBOX_MAX_AGE = 30
+
+SERVICE_PROFILE = 'profile'
+ATTR_POLLS = 'polls'
+SERVICE_RECORD = 'record'
+ATTR_ENABLED = 'enabled'
 
 class CodeEnum(StrEnum):
     OK = '200'
@@ -52,3 +63,14 @@ class SwitchEnum(StrEnum):
     lock = KEY_LOCK
     # keytone = KEY_KEY_TONE
     # led = KEY_LED_BRIGHT
+
+class AggregateEnum(StrEnum):
+    temp_mean = 'tempMean'
+    temp_min = 'tempMin'
+    temp_max = 'tempMax'
+    delta_t_mean = 'deltaTMean'
+    on = 'onCount'
+    off = 'offCount'
+    cold = 'coldCount'
+    heat = 'heatCount'
+    floor_heat = 'floorHeatCount'
@@ -3,6 +3,8 @@
 from datetime import timedelta, datetime
 import logging
 import asyncio
+import time
+from types import MappingProxyType
 import async_timeout
 
 from homeassistant.const import CONF_USERNAME, CONF_PASSWORD, CONF_TOKEN
@@ -12,25 +14,123 @@ from homeassistant.helpers.update_coordinator import (
     UpdateFailed,
 )
 from homeassistant.exceptions import ConfigEntryAuthFailed
+from homeassistant.helpers.entity import Entity
 
 from .const import (
     DOMAIN, CONF_REFRESH_TOKEN, KEY_CODE, KEY_NAME, KEY_HEAT_MAX, KEY_HEAT_MIN, 
     KEY_COLD_MAX, KEY_COLD_MIN, KEY_MAC, KEY_HOME_ID, KEY_STATE, KEY_TARGET_TEMP, 
     KEY_MODE, KEY_ECO, KEY_SILENT, KEY_DRY_FLOOR, KEY_LOCK, KEY_OUTLET_TEMP, 
     KEY_INLET_TEMP, KEY_CUR_TEMP, KEY_TS, KEY_XKQ_TYPE, KEY_DEVICE_TYPE, KEY_KEY_TONE,
-    KEY_LED_BRIGHT, KEY_SCREEN_BRIGHT
+    KEY_LED_BRIGHT, KEY_SCREEN_BRIGHT, AggregateEnum, ModeEnum
 )
-from .request import refresh_auth, req_homes, req_status, req_cmd, set_hass
+from .request import refresh_auth, req_homes, req_status, req_cmd, set_hass, SEND_ERRORS
+from .tracing import Tracer
+from . import tracing
+from .outbox import CommandOutbox
+from . import profiler
 
 
 _LOGGER = logging.getLogger(__name__)
 
 INTERVAL = timedelta(seconds=10)
+# polling only reconciles missed pushes while the push channel is up
+RECONCILE_INTERVAL = timedelta(minutes=5)
+# controllers in the "poll rarely" tier are polled once every RARE_POLL_EVERY polls
+RARE_POLL_EVERY = 30
+
+STATUS_KEYS = (
+    KEY_STATE, KEY_TARGET_TEMP, KEY_MODE, KEY_ECO, KEY_SILENT, KEY_DRY_FLOOR, KEY_LOCK,
+    KEY_OUTLET_TEMP, KEY_INLET_TEMP, KEY_CUR_TEMP, KEY_KEY_TONE, KEY_LED_BRIGHT, KEY_SCREEN_BRIGHT,
+)
+
+
+def selection_id(home_id, xkq_code=None) -> str:
+    """Id of a home or controller in the exclude / poll rarely options."""
+    if xkq_code is None:
+        return str(home_id)
+    return f'{home_id}/{xkq_code}'
+
+
+def _aggregate(xkqs):
+    """Home level aggregates, computed in a single pass over the controllers."""
+    temps = 0.0
+    temp_n = 0
+    temp_min = temp_max = None
+    delta = 0.0
+    delta_n = 0
+    on = off = cold = heat = floor_heat = 0
+    for xkq in xkqs:
+        temp = xkq.get(KEY_CUR_TEMP)
+        if temp is not None:
+            temps += temp
+            temp_n += 1
+            temp_min = temp if temp_min is None or temp < temp_min else temp_min
+            temp_max = temp if temp_max is None or temp > temp_max else temp_max
+        outlet = xkq.get(KEY_OUTLET_TEMP)
+        inlet = xkq.get(KEY_INLET_TEMP)
+        if outlet is not None and inlet is not None:
+            delta += outlet - inlet
+            delta_n += 1
+        state = xkq.get(KEY_STATE)
+        if state is None:
+            continue
+        if state == 0:
+            off += 1
+            continue
+        on += 1
+        mode = xkq.get(KEY_MODE)
+        if mode == ModeEnum.COLD:
+            cold += 1
+        elif mode == ModeEnum.HEAT:
+            heat += 1
+        elif mode == ModeEnum.FLOOR_HEAT:
+            floor_heat += 1
+    return MappingProxyType({
+        AggregateEnum.temp_mean: round(temps / temp_n, 1) if temp_n else None,
+        AggregateEnum.temp_min: temp_min,
+        AggregateEnum.temp_max: temp_max,
+        AggregateEnum.delta_t_mean: round(delta / delta_n, 1) if delta_n else None,
+        AggregateEnum.on: on,
+        AggregateEnum.off: off,
+        AggregateEnum.cold: cold,
+        AggregateEnum.heat: heat,
+        AggregateEnum.floor_heat: floor_heat,
+    })
+
+
+def _merge_home(home, xkq_status):
+    """Return home with xkq_status applied.
+
+    Snapshots are read-only mappings. Controllers whose status did not change are
+    reused as is, and so is home itself when nothing changed, so readers can
+    detect changes by identity.
+    """
+    status_by_code = {item.get(KEY_CODE): item for item in xkq_status}
+    changed = False
+    xkqs = []
+    for xkq in home['xkqList']:
+        status = status_by_code.get(xkq[KEY_CODE])
+        if status is None:
+            xkqs.append(xkq)
+            continue
+        # pushed updates may carry only some of the fields
+        update = {key: status[key] for key in STATUS_KEYS if key in status}
+        if any(xkq.get(key) != value for key, value in update.items()):
+            xkq = MappingProxyType({**xkq, **update})
+            changed = True
+        xkqs.append(xkq)
+    if not changed:
+        return home
+    return MappingProxyType({**home, 'xkqList': tuple(xkqs), 'aggregates': _aggregate(xkqs)})
+
 
 class Coordinator(DataUpdateCoordinator[dict]):
     """My custom coordinator."""
 
-    def __init__(self, hass, username, password, token, refresh_token):
+    def __init__(
+        self, hass, username, password, token, refresh_token, outbox: CommandOutbox,
+        exclude=(), poll_rarely=(), tracer: Tracer | None = None,
+    ):
         """Initialize my coordinator."""
         _LOGGER.debug('Coordinator.init')
         super().__init__(
@@ -50,7 +150,29 @@ class Coordinator(DataUpdateCoordinator[dict]):
         self._password = password
         self._token = token
         self._refresh_token = refresh_token
-        self._devices = {}
+        self._outbox = outbox
+        self.tracer = tracer or Tracer()
+        self._exclude = set(exclude)
+        self._poll_rarely = set(poll_rarely)
+        self._polls = 0
+        self._topology = {}
+        # (home_id, xkq_code) -> mac, device identifiers are built from it
+        self._macs = {}
+        self._home_names = {}
+        self._discovered = False
+        # seconds spent in each setup phase, see async_setup_entry
+        self.startup = {}
+        self._devices = MappingProxyType({})
+        self._index = {}
+        # (home_id, xkq_code) -> monotonic time of the last pushed status
+        self._pushed_at = {}
+        # batched entity state writes, see schedule_write
+        self._pending_writes = {}
+        self._rendered = {}
+        self._batching = False
+        self._flush_handle = None
+        self.writes = 0
+        self.writes_avoided = 0
         self._ts = datetime.now()
         set_hass(hass)
 
@@ -64,16 +186,34 @@ class Coordinator(DataUpdateCoordinator[dict]):
         coordinator.async_config_entry_first_refresh.
         """
         _LOGGER.debug('Coordinator._async_setup')
-        res = await self._auth()
+        if not self._discovered:
+            await self.async_discover()
+
+    async def async_discover(self):
+        """Log in and discover homes and controllers, without fetching status."""
+        start = time.monotonic()
+        with tracing.use(self.tracer):
+            res = await self._auth()
         if not res:
             _LOGGER.debug('auth failed')
             raise ConfigEntryAuthFailed
+        self.startup['auth'] = time.monotonic() - start
 
+        start = time.monotonic()
+        devices = {}
         for home in res['data']['homeList']:
             home_id = home[KEY_HOME_ID]
-            home_data = await req_homes(home[KEY_HOME_ID])
-            self._devices[home_id] = {
-                'xkqList': [{
+            self._home_names[home_id] = home.get('homeName') or str(home_id)
+            with tracing.use(self.tracer):
+                home_data = await req_homes(home[KEY_HOME_ID])
+            self._topology[home_id] = [
+                (xkq[KEY_CODE], xkq[KEY_NAME]) for xkq in home_data['data']['homeDetail']['xkqList']
+            ]
+            for xkq in home_data['data']['homeDetail']['xkqList']:
+                self._macs[(home_id, xkq[KEY_CODE])] = xkq[KEY_MAC]
+            if selection_id(home_id) in self._exclude:
+                continue
+            xkqs = tuple(MappingProxyType({
                     KEY_TS: 0,
                     KEY_CODE: xkq[KEY_CODE],
                     KEY_NAME: xkq[KEY_NAME],
@@ -85,10 +225,13 @@ class Coordinator(DataUpdateCoordinator[dict]):
                     KEY_HOME_ID: home_id,
                     KEY_DEVICE_TYPE: xkq['type'],
                     KEY_XKQ_TYPE: xkq[KEY_XKQ_TYPE],
-                } for xkq in home_data['data']['homeDetail']['xkqList']],
-            }
-        _LOGGER.debug('devices:')
-        _LOGGER.debug(self._devices)
+                }) for xkq in home_data['data']['homeDetail']['xkqList']
+                    if selection_id(home_id, xkq[KEY_CODE]) not in self._exclude)
+            devices[home_id] = MappingProxyType({'xkqList': xkqs, 'aggregates': _aggregate(xkqs)})
+        self._swap(MappingProxyType(devices))
+        self._discovered = True
+        self.startup['discovery'] = time.monotonic() - start
+        _LOGGER.debug('discovered %d homes', len(self._devices))
 
     async def _async_update_data(self) -> dict:
         """Fetch data from API endpoint.
@@ -96,7 +239,7 @@ class Coordinator(DataUpdateCoordinator[dict]):
         This is the place to pre-process the data to lookup tables
         so entities can quickly look up their data.
         """
-        _LOGGER.debug('Coordinator._async_update_data')
+        start = time.monotonic()
         await self._refresh_auth()
         try:
             # Note: asyncio.TimeoutError and aiohttp.ClientError are already
@@ -106,35 +249,166 @@ class Coordinator(DataUpdateCoordinator[dict]):
                 # Note: using context is not required if there is no need or ability to limit
                 # data retrieved from API.
                 devices = self._devices
-                home_ids = list(devices.keys())
-                for home_id in home_ids:
-                    xkq_devices = devices[home_id]['xkqList']
-                    xkq_list = [{
-                        KEY_TS: 0, # xkq[KEY_TS]
-                        KEY_CODE: xkq[KEY_CODE]
-                    } for xkq in xkq_devices]
-                    res = await req_status(home_id, xkq_list)
-                    xkq_status = res['data']['xkqStatusList']
-                    for xkq in xkq_devices:
-                        status = [item for item in xkq_status if item.get(KEY_CODE) == xkq[KEY_CODE]][0]
-                        xkq[KEY_STATE] = status[KEY_STATE]
-                        xkq[KEY_TARGET_TEMP] = status[KEY_TARGET_TEMP]
-                        xkq[KEY_MODE] = status[KEY_MODE]
-                        xkq[KEY_ECO] = status[KEY_ECO]
-                        xkq[KEY_SILENT] = status[KEY_SILENT]
-                        xkq[KEY_DRY_FLOOR] = status[KEY_DRY_FLOOR]
-                        xkq[KEY_LOCK] = status[KEY_LOCK]
-                        xkq[KEY_OUTLET_TEMP] = status[KEY_OUTLET_TEMP]
-                        xkq[KEY_INLET_TEMP] = status[KEY_INLET_TEMP]
-                        xkq[KEY_CUR_TEMP] = status[KEY_CUR_TEMP]
-                        xkq[KEY_KEY_TONE] = status[KEY_KEY_TONE]
-                        xkq[KEY_LED_BRIGHT] = status[KEY_LED_BRIGHT]
-                        xkq[KEY_SCREEN_BRIGHT] = status[KEY_SCREEN_BRIGHT]
-                _LOGGER.debug(self._devices)
+                rare_due = self._polls % RARE_POLL_EVERY == 0
+                self._polls += 1
+                results = {}
+                for home_id, home in devices.items():
+                    xkq_codes = tuple(
+                        xkq[KEY_CODE] for xkq in home['xkqList']
+                        if rare_due or not self._is_rare(home_id, xkq[KEY_CODE])
+                    )
+                    if not xkq_codes:
+                        continue
+                    sent_at = time.monotonic()
+                    res = await req_status(home_id, xkq_codes)
+                    results[home_id] = (sent_at, res['data']['xkqStatusList'])
+                # filtered at merge time, pushes may arrive while later homes are still polled
+                with profiler.phase('merge'):
+                    self._apply_status({
+                        home_id: self._newer_than_push(home_id, sent_at, xkq_status)
+                        for home_id, (sent_at, xkq_status) in results.items()
+                    })
+                self.tracer.poll(time.monotonic() - start, self._devices)
+                self._outbox.retry_now()
                 return self._devices
         except Exception as err:
             raise UpdateFailed(f"Error communicating with API: {err}")
 
+    async def _async_refresh(self, *args, **kwargs):
+        with profiler.poll(self, self.hass), tracing.use(self.tracer):
+            await super()._async_refresh(*args, **kwargs)
+
+    @callback
+    def async_update_listeners(self) -> None:
+        self._batching = True
+        try:
+            with profiler.phase('fanout'):
+                super().async_update_listeners()
+        finally:
+            self._batching = False
+        with profiler.phase('flush'):
+            self._flush_writes()
+
+    @callback
+    def schedule_write(self, entity: Entity):
+        """Queue an entity state write, flushed in one batch after the listener fan-out."""
+        self._pending_writes[entity] = None
+        if not self._batching and self._flush_handle is None:
+            self._flush_handle = self.hass.loop.call_soon(self._flush_writes)
+
+    @callback
+    def skip_write(self):
+        self.writes_avoided += 1
+
+    @callback
+    def _flush_writes(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        pending, self._pending_writes = self._pending_writes, {}
+        for entity in pending:
+            if entity.hass is None:
+                self._rendered.pop(entity, None)
+                continue
+            # building the attribute dicts here would cost as much as the write itself,
+            # entities whose attributes change with the data expose the inputs instead
+            rendered = (entity.available, entity.state, getattr(entity, 'rendered_attrs', None))
+            if self._rendered.get(entity) == rendered:
+                self.writes_avoided += 1
+                continue
+            self._rendered[entity] = rendered
+            self.writes += 1
+            entity.async_write_ha_state()
+
+    def _is_rare(self, home_id, xkq_code):
+        return (selection_id(home_id) in self._poll_rarely
+                or selection_id(home_id, xkq_code) in self._poll_rarely)
+
+    def get_home_name(self, home_id):
+        return self._home_names.get(home_id, str(home_id))
+
+    def get_aggregates(self, home_id):
+        """Aggregates of the home's current snapshot, a new object only when the home changed."""
+        home = self._devices.get(home_id)
+        return home['aggregates'] if home else None
+
+    def get_topology(self):
+        """All discovered homes and controllers, including excluded ones.
+
+        Returns {home_id: (home_name, [(xkq_code, xkq_name), ...])}.
+        """
+        return {
+            home_id: (self._home_names[home_id], xkqs)
+            for home_id, xkqs in self._topology.items()
+        }
+
+    def excluded_device_ids(self):
+        """Device registry identifiers of the excluded homes and controllers."""
+        ids = []
+        for home_id, xkqs in self._topology.items():
+            home_excluded = selection_id(home_id) in self._exclude
+            if home_excluded:
+                ids.append(f'hitachi_home_{home_id}')
+            ids += [
+                f'hitachi_{self._macs[(home_id, xkq_code)]}' for xkq_code, _ in xkqs
+                if home_excluded or selection_id(home_id, xkq_code) in self._exclude
+            ]
+        return ids
+
+    def _newer_than_push(self, home_id, sent_at, xkq_status):
+        """Drop polled status of controllers pushed after the poll request went out.
+
+        The pushed state is newer than whatever the cloud answered, so merging the
+        poll result would roll it back.
+        """
+        pushed_at = self._pushed_at
+        if not pushed_at:
+            return xkq_status
+        return [
+            item for item in xkq_status
+            if pushed_at.get((home_id, item.get(KEY_CODE)), 0) <= sent_at
+        ]
+
+    def _apply_status(self, results):
+        """Merge {home_id: xkq_status} into a new snapshot and swap it in."""
+        homes = dict(self._devices)
+        changed = False
+        for home_id, xkq_status in results.items():
+            home = homes.get(home_id)
+            if home is None:
+                continue
+            merged = _merge_home(home, xkq_status)
+            if merged is not home:
+                homes[home_id] = merged
+                changed = True
+        if changed:
+            self._swap(MappingProxyType(homes))
+
+    def _swap(self, devices):
+        self._index = {
+            (home_id, xkq[KEY_CODE]): xkq
+            for home_id, home in devices.items() for xkq in home['xkqList']
+        }
+        self._devices = devices
+
+    @callback
+    def push_status(self, home_id, xkq_status):
+        """Merge pushed controller status and notify listeners without polling."""
+        home_id = next((k for k in self._devices if str(k) == str(home_id)), home_id)
+        now = time.monotonic()
+        for item in xkq_status:
+            self._pushed_at[(home_id, item[KEY_CODE])] = now
+        self._apply_status({home_id: xkq_status})
+        # async_set_updated_data would reschedule the refresh, a busy relay would then
+        # hold off the reconcile poll and the auth refresh and outbox retries it runs
+        self.data = self._devices
+        self.async_update_listeners()
+
+    @callback
+    def set_push_active(self, active: bool):
+        self.update_interval = RECONCILE_INTERVAL if active else INTERVAL
+        _LOGGER.debug('push active: %s, poll interval %s', active, self.update_interval)
+
     async def _auth(self):
         username = self._username
         password = self._password
@@ -159,11 +433,8 @@ class Coordinator(DataUpdateCoordinator[dict]):
         return res
     
     def get_data(self, home_id: str, xkq_code: str):
-        devices = self._devices
-        dev = [item for item in devices[home_id]['xkqList'] if item[KEY_CODE] == xkq_code]
-        if len(dev) > 0:
-            return dev[0]
-        return None
+        """Return the controller's current read-only record, replaced (never mutated) when it changes."""
+        return self._index.get((home_id, xkq_code))
 
     async def control(self, home_id, xkq_code, cmd_dict):
         dev = self.get_data(home_id, xkq_code)
@@ -173,7 +444,16 @@ class Coordinator(DataUpdateCoordinator[dict]):
             KEY_DEVICE_TYPE: dev[KEY_DEVICE_TYPE],
             KEY_XKQ_TYPE: dev[KEY_XKQ_TYPE],
         }
-        return await req_cmd(device_info, cmd_dict)
+        # a queued command is superseded by this one, send them together
+        cmd_dict = {**self._outbox.pop(home_id, xkq_code), **cmd_dict}
+        try:
+            with tracing.use(self.tracer):
+                return await req_cmd(device_info, cmd_dict)
+        except SEND_ERRORS as err:
+            # the cloud is unreachable, keep the command until it comes back
+            _LOGGER.warning('command for %s queued: %s', xkq_code, err)
+            self._outbox.put(device_info, cmd_dict)
+            return None
 
     def get_devices(self):
         return self._devices
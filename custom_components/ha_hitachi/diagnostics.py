@@ -0,0 +1,39 @@
+"""Diagnostics support for Hitachi."""
+
+from typing import Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.const import CONF_USERNAME, CONF_PASSWORD, CONF_TOKEN
+from homeassistant.core import HomeAssistant
+
+from . import HitachiConfigEntry
+from .const import CONF_REFRESH_TOKEN
+
+TO_REDACT = {
+    CONF_USERNAME, CONF_PASSWORD, CONF_TOKEN, CONF_REFRESH_TOKEN,
+    'phoneNo', 'password', 'token', 'refreshToken', 'jgRegId',
+}
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: HitachiConfigEntry
+) -> dict[str, Any]:
+    """Return diagnostics for a config entry."""
+    coordinator = entry.runtime_data.coordinator
+    return {
+        'entry': async_redact_data(entry.data, TO_REDACT),
+        'devices': {
+            home_id: {
+                'xkqList': [dict(xkq) for xkq in home['xkqList']],
+                'aggregates': dict(home['aggregates']),
+            }
+            for home_id, home in coordinator.get_devices().items()
+        },
+        'startup': coordinator.startup,
+        'state_writes': {
+            'written': coordinator.writes,
+            'avoided': coordinator.writes_avoided,
+        },
+        'outbox_depth': entry.runtime_data.outbox.depth,
+        'trace': async_redact_data(coordinator.tracer.as_dict(), TO_REDACT),
+    }
@@ -0,0 +1,177 @@
+"""Persistent outbox for controller commands that could not reach the cloud."""
+
+import asyncio
+import logging
+import time
+from collections.abc import Callable
+
+from homeassistant.core import HomeAssistant, callback, CALLBACK_TYPE
+from homeassistant.helpers.event import async_call_later
+from homeassistant.helpers.storage import Store
+
+from .const import DOMAIN, KEY_CODE, KEY_HOME_ID, DEFAULT_OUTBOX_MAX_AGE
+from .request import req_cmd, SEND_ERRORS
+from .tracing import Tracer
+from . import tracing
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_VERSION = 1
+RETRY_MIN = 10
+RETRY_MAX = 600
+
+
+def _store(hass: HomeAssistant, entry_id: str) -> Store:
+    return Store(hass, STORAGE_VERSION, f'{DOMAIN}.outbox.{entry_id}')
+
+
+async def async_remove_store(hass: HomeAssistant, entry_id: str):
+    await _store(hass, entry_id).async_remove()
+
+
+class CommandOutbox:
+    """Pending commands per controller, retried with backoff until the cloud accepts them.
+
+    A newer command for the same controller is merged over the queued one, so
+    only the latest value of each key is ever sent. Commands not delivered within
+    max_age minutes of being queued are dropped.
+    """
+
+    def __init__(
+        self, hass: HomeAssistant, entry_id: str, max_age: int = DEFAULT_OUTBOX_MAX_AGE,
+        tracer: Tracer | None = None,
+    ):
+        self._hass = hass
+        self._tracer = tracer
+        self._store = _store(hass, entry_id)
+        self._max_age = max_age * 60
+        # (home_id, xkq_code) -> {'device_info': ..., 'cmd': ..., 'queued_at': ...}
+        self._pending = {}
+        self._listeners = []
+        self._lock = asyncio.Lock()
+        self._delay = RETRY_MIN
+        self._unsub_retry = None
+        self._unsaved = False
+
+    @property
+    def depth(self) -> int:
+        return len(self._pending)
+
+    async def async_load(self):
+        data = await self._store.async_load() or []
+        for item in data:
+            if self._expired(item):
+                _LOGGER.debug('outbox dropped expired command: %s', item['cmd'])
+                continue
+            info = item['device_info']
+            self._pending[(str(info[KEY_HOME_ID]), info[KEY_CODE])] = item
+        if len(self._pending) != len(data):
+            self._changed()
+        if self._pending:
+            _LOGGER.debug('outbox restored %d commands', self.depth)
+            self._schedule_retry()
+
+    @callback
+    def async_add_listener(self, update: Callable[[], None]) -> CALLBACK_TYPE:
+        self._listeners.append(update)
+        return lambda: self._listeners.remove(update)
+
+    def pop(self, home_id, xkq_code) -> dict:
+        """Remove and return the queued command for a controller, empty if none."""
+        item = self._pending.pop((str(home_id), xkq_code), None)
+        if item is None:
+            return {}
+        self._changed()
+        return {} if self._expired(item) else item['cmd']
+
+    def put(self, device_info: dict, cmd_dict: dict):
+        key = (str(device_info[KEY_HOME_ID]), device_info[KEY_CODE])
+        queued = self._pending.get(key)
+        queued = {} if queued is None or self._expired(queued) else queued['cmd']
+        self._pending[key] = {
+            'device_info': device_info,
+            'cmd': {**queued, **cmd_dict},
+            'queued_at': time.time(),
+        }
+        _LOGGER.debug('outbox queued %s: %s', key, self._pending[key]['cmd'])
+        self._changed()
+        self._schedule_retry()
+
+    @callback
+    def retry_now(self):
+        """Hint that the cloud is reachable again."""
+        if self._pending and not self._lock.locked():
+            self._cancel_retry()
+            self._delay = RETRY_MIN
+            self._hass.async_create_task(self.async_flush())
+
+    async def async_flush(self):
+        async with self._lock:
+            for key in list(self._pending):
+                # control() may have taken the entry while an earlier send was awaited
+                item = self._pending.get(key)
+                if item is None:
+                    continue
+                if self._expired(item):
+                    _LOGGER.debug('outbox dropped expired command for %s: %s', key, item['cmd'])
+                    del self._pending[key]
+                    self._changed()
+                    continue
+                try:
+                    with tracing.use(self._tracer):
+                        res = await req_cmd(item['device_info'], item['cmd'])
+                except SEND_ERRORS as err:
+                    _LOGGER.debug('outbox retry failed: %s', err)
+                    self._delay = min(self._delay * 2, RETRY_MAX)
+                    self._schedule_retry()
+                    return
+                except Exception:
+                    # the cloud may already have applied it, sending it again is not safe
+                    if self._pending.get(key) is item:
+                        del self._pending[key]
+                        self._changed()
+                    raise
+                # a newer command may have replaced the entry while we were sending
+                if self._pending.get(key) is item:
+                    del self._pending[key]
+                    self._changed()
+                _LOGGER.debug('outbox sent %s: %s', key, res)
+            self._delay = RETRY_MIN
+
+    def _expired(self, item) -> bool:
+        return time.time() - item.get('queued_at', 0) > self._max_age
+
+    async def async_shutdown(self):
+        self._cancel_retry()
+        # let a running flush finish, then write now instead of leaving a delayed save
+        # behind: it would recreate the file after async_remove_store deletes the entry
+        async with self._lock:
+            if self._unsaved:
+                await self._store.async_save(self._data_to_save())
+
+    @callback
+    def _schedule_retry(self):
+        if self._unsub_retry is None:
+            self._unsub_retry = async_call_later(self._hass, self._delay, self._retry)
+
+    @callback
+    def _cancel_retry(self):
+        if self._unsub_retry is not None:
+            self._unsub_retry()
+            self._unsub_retry = None
+
+    @callback
+    def _retry(self, _now):
+        self._unsub_retry = None
+        self._hass.async_create_task(self.async_flush())
+
+    def _data_to_save(self):
+        self._unsaved = False
+        return list(self._pending.values())
+
+    @callback
+    def _changed(self):
+        self._unsaved = True
+        self._store.async_delay_save(self._data_to_save, 1)
+        for update in list(self._listeners):
+            update()
@@ -0,0 +1,173 @@
+"""On-demand profiling of coordinator polls.
+
+While active, the time spent in each phase of a poll (request, decode, merge,
+fanout, flush) is recorded. decode, merge, fanout and flush run synchronously on
+the event loop, so their sum is the loop blocking time attributed to this
+integration. cProfile is only enabled inside those phases: enabling it across the
+request's await would also profile every other task the loop runs meanwhile.
+Results go to the config directory once the requested number of polls has
+completed.
+
+cProfile can only run once per interpreter, so a single poll is profiled at a
+time: the coordinator that started it owns it, and phases timed in other
+entries' tasks meanwhile are not counted.
+"""
+
+import io
+import logging
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from homeassistant.core import HomeAssistant
+
+_LOGGER = logging.getLogger(__name__)
+
+BLOCKING_PHASES = ('decode', 'merge', 'fanout', 'flush')
+
+
+class PollProfiler:
+
+    def __init__(self, polls: int):
+        self.remaining = polls
+        self.polls = 0
+        self.phases = defaultdict(list)
+        self.blocking = []
+        import cProfile
+        self._profile = cProfile.Profile()
+        self._profiling = True
+        self._depth = 0
+        self._poll_phases = None
+
+    def start_poll(self):
+        self._poll_phases = defaultdict(float)
+
+    def end_poll(self):
+        for name, elapsed in self._poll_phases.items():
+            self.phases[name].append(elapsed)
+        self.blocking.append(sum(self._poll_phases[name] for name in BLOCKING_PHASES))
+        self._poll_phases = None
+        self.polls += 1
+        self.remaining -= 1
+
+    def enable(self):
+        """Profile the blocking phase being entered, nested phases share one enable."""
+        self._depth += 1
+        if self._depth > 1 or not self._profiling:
+            return
+        try:
+            self._profile.enable()
+        except ValueError as err:
+            # another profiler owns the interpreter
+            _LOGGER.warning('cProfile unavailable, recording phase times only: %s', err)
+            self._profiling = False
+
+    def disable(self):
+        self._depth -= 1
+        if self._depth == 0 and self._profiling:
+            self._profile.disable()
+
+    def add(self, name: str, elapsed: float):
+        if self._poll_phases is not None:
+            self._poll_phases[name] += elapsed
+
+    def summary(self) -> str:
+        lines = [
+            f'polls: {self.polls}',
+            f'cProfile covers the blocking phases only: {", ".join(BLOCKING_PHASES)}',
+            '',
+            f'{"phase":<10}{"count":>8}{"total ms":>12}{"mean ms":>10}{"max ms":>10}',
+        ]
+        rows = dict(self.phases)
+        rows['blocking'] = self.blocking
+        for name, values in rows.items():
+            if not values:
+                continue
+            total = sum(values) * 1000
+            lines.append(
+                f'{name:<10}{len(values):>8}{total:>12.1f}{total / len(values):>10.2f}{max(values) * 1000:>10.2f}'
+            )
+        import pstats
+        stream = io.StringIO()
+        pstats.Stats(self._profile, stream=stream).sort_stats('cumulative').print_stats(30)
+        lines += ['', stream.getvalue()]
+        return '\n'.join(lines)
+
+    def write(self, base: str):
+        self._profile.dump_stats(f'{base}.prof')
+        with open(f'{base}.txt', 'w', encoding='utf-8') as f:
+            f.write(self.summary())
+
+
+_active: PollProfiler | None = None
+# coordinator whose poll is being profiled
+_owner = None
+# coordinator of the running task, phase() only counts time spent in the owner's poll
+_task_owner: ContextVar = ContextVar('hitachi_profile_owner', default=None)
+
+
+def start(polls: int) -> bool:
+    """Profile the next polls, refused while a profiled poll is running."""
+    global _active
+    if _owner is not None:
+        return False
+    _active = PollProfiler(polls)
+    _LOGGER.info('profiling the next %d polls', polls)
+    return True
+
+
+@contextmanager
+def poll(owner, hass: HomeAssistant):
+    """Profile the poll run inside the block, unless another poll already is."""
+    global _owner
+    profiler = _active
+    if profiler is None or _owner is not None:
+        yield
+        return
+    profiler.start_poll()
+    _owner = owner
+    token = _task_owner.set(owner)
+    try:
+        yield
+    finally:
+        _task_owner.reset(token)
+        _owner = None
+        _end_poll(hass, profiler)
+
+
+def _end_poll(hass: HomeAssistant, profiler: PollProfiler):
+    global _active
+    profiler.end_poll()
+    if profiler.remaining <= 0:
+        if _active is profiler:
+            _active = None
+        base = hass.config.path(f'hitachi_profile_{int(time.time())}')
+        hass.async_create_task(_async_write(hass, profiler, base))
+
+
+async def _async_write(hass: HomeAssistant, done: PollProfiler, base: str):
+    try:
+        await hass.async_add_executor_job(done.write, base)
+    except OSError as err:
+        _LOGGER.error('could not write profile to %s: %s', base, err)
+        return
+    _LOGGER.info('profile written to %s.prof and %s.txt', base, base)
+
+
+@contextmanager
+def phase(name: str):
+    profiler = _active
+    if profiler is None or _owner is None or _task_owner.get() is not _owner:
+        yield
+        return
+    blocking = name in BLOCKING_PHASES
+    if blocking:
+        profiler.enable()
+    start_ts = time.perf_counter()
+    try:
+        yield
+    finally:
+        profiler.add(name, time.perf_counter() - start_ts)
+        if blocking:
+            profiler.disable()
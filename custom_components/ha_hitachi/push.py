@@ -0,0 +1,102 @@
+"""Push update channel.
+
+The app registers a jgRegId for vendor push, but that channel is not open to
+third parties, so the listener connects to a relay speaking newline delimited
+JSON over TCP instead. Each line carries the same shape as the status API data:
+
+    {"homeId": 123, "xkqStatusList": [{"xkqCode": "...", "xkqSxc14Onoff": 1, ...}]}
+"""
+
+import asyncio
+import json
+import logging
+from urllib.parse import urlsplit
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .const import KEY_CODE, CONF_PUSH_URL
+from .coordinator import Coordinator
+
+_LOGGER = logging.getLogger(__name__)
+
+RETRY_MIN = 5
+RETRY_MAX = 300
+# longest accepted message line
+LINE_LIMIT = 1024 * 1024
+
+
+def parse_push_url(url: str):
+    parts = urlsplit(url)
+    if parts.scheme != 'tcp' or not parts.hostname or not parts.port:
+        raise ValueError(f'unsupported push url: {url}')
+    return parts.hostname, parts.port
+
+
+def entry_push_url(entry: ConfigEntry) -> str | None:
+    """The entry's push relay, set in the user step until the options flow has been saved."""
+    if entry.options:
+        return entry.options.get(CONF_PUSH_URL)
+    return entry.data.get(CONF_PUSH_URL)
+
+
+class PushListener:
+    """Long-lived push connection feeding status changes into the coordinator."""
+
+    def __init__(self, hass: HomeAssistant, coordinator: Coordinator, url: str):
+        self._hass = hass
+        self._coordinator = coordinator
+        self._host, self._port = parse_push_url(url)
+        self._task = None
+
+    def start(self):
+        self._task = self._hass.async_create_background_task(self._run(), 'hitachi push listener')
+
+    async def async_stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        self._coordinator.set_push_active(False)
+
+    async def _run(self):
+        delay = RETRY_MIN
+        while True:
+            try:
+                reader, writer = await asyncio.open_connection(self._host, self._port, limit=LINE_LIMIT)
+            except OSError as err:
+                _LOGGER.debug('push connect failed: %s', err)
+            else:
+                _LOGGER.debug('push connected to %s:%s', self._host, self._port)
+                delay = RETRY_MIN
+                self._coordinator.set_push_active(True)
+                try:
+                    while line := await reader.readline():
+                        try:
+                            self._handle_line(line)
+                        except Exception:
+                            _LOGGER.exception('push message failed: %.200s', line)
+                except (OSError, ValueError) as err:
+                    # ValueError: line over LINE_LIMIT, the stream position is lost
+                    _LOGGER.debug('push connection lost: %s', err)
+                finally:
+                    self._coordinator.set_push_active(False)
+                    writer.close()
+                # catch up on anything missed while disconnected
+                await self._coordinator.async_request_refresh()
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, RETRY_MAX)
+
+    def _handle_line(self, line: bytes):
+        try:
+            msg = json.loads(line)
+            home_id = msg['homeId']
+            items = msg['xkqStatusList']
+        except (ValueError, KeyError, TypeError):
+            _LOGGER.debug('push message ignored: %.200s', line)
+            return
+        if not isinstance(items, list):
+            _LOGGER.debug('push message ignored: %.200s', line)
+            return
+        xkq_status = [item for item in items if isinstance(item, dict) and KEY_CODE in item]
+        if xkq_status:
+            self._coordinator.push_status(home_id, xkq_status)
@@ -1,11 +1,23 @@
 import httpx
 import time
+import json
 import logging
 import asyncio
-from functools import partial
-from .const import CodeEnum, KEY_CODE, KEY_DEVICE_TYPE, KEY_XKQ_TYPE, KEY_HOME_ID
+from collections import deque
+from . import tracing
+from . import profiler
+from .const import CodeEnum, KEY_TS, KEY_CODE, KEY_DEVICE_TYPE, KEY_XKQ_TYPE, KEY_HOME_ID
 from homeassistant.helpers.httpx_client import get_async_client
 
+try:
+    import orjson
+    _dumps = orjson.dumps
+    _loads = orjson.loads
+except ImportError:
+    def _dumps(obj):
+        return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode()
+    _loads = json.loads
+
 _LOGGER = logging.getLogger(__name__)
 
 
@@ -19,49 +31,163 @@ _jgRegId = '1507bfd3f6ce767df06'
 _token = ''
 _hass = None
 
-_client = None
+_recorder = None
+_replay = None
+
+# raised before a response arrived, so the command can be queued and sent again
+SEND_ERRORS = (httpx.TransportError, TimeoutError)
+
+_REDACTED = '**REDACTED**'
+_REDACT_KEYS = {'password', 'phoneNo', 'token', 'refreshToken', 'jgRegId', 'authorization'}
 
 def set_hass(hass):
     global _hass
     _hass = hass
 
+_STATIC_HEADERS = {
+    'host': '1app.hicloud.hisensehitachi.com',
+    'accept-charset': 'UTF-8',
+    'x-his-locale': 'zh_CN',
+    'x-his-apikey': '1QiLCJhbGciOiJIUzI1NiJ9',
+    'x-his-appid': 'com.hisensehitachi.iez2',
+    'x-his-os': 'Android',
+    'x-his-version': '7.2.0.240618_release',
+    'content-type': 'application/json',
+    'x-his-apptag': 'V3',
+    'user-agent': 'Dalvik/2.1.0 (Linux; U; Android 12; V2304A Build/W528JS)',
+    'accept-encoding': 'gzip',
+}
+_authorization = 'Bearer'
+
+# serialized req_status bodies per (home_id, xkq codes), a topology change yields a new key
+_status_bodies = {}
+
 def _gen_headers():
-    return {
-        'host': '1app.hicloud.hisensehitachi.com',
-        'accept-charset': 'UTF-8',
-        'authorization': (f'Bearer {_token}').strip(),
-        'x-his-locale': 'zh_CN',
-        'x-his-apikey': '1QiLCJhbGciOiJIUzI1NiJ9',
-        'x-his-timestamp': f'{int(time.time()*1000)}',
-        'x-his-appid': 'com.hisensehitachi.iez2',
-        'x-his-os': 'Android',
-        'x-his-version': '7.2.0.240618_release',
-        'content-type': 'application/json',
-        'x-his-apptag': 'V3',
-        'user-agent': 'Dalvik/2.1.0 (Linux; U; Android 12; V2304A Build/W528JS)',
-        'accept-encoding': 'gzip',
-    }
+    headers = _STATIC_HEADERS.copy()
+    headers['authorization'] = _authorization
+    headers['x-his-timestamp'] = f'{int(time.time()*1000)}'
+    return headers
 
 _domain = 'https://1app.hicloud.hisensehitachi.com/'
 
-async def _post(url, payload):
-    get_client = None
+def _redact(obj):
+    if isinstance(obj, dict):
+        return {k: _REDACTED if k in _REDACT_KEYS else _redact(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_redact(i) for i in obj]
+    return obj
+
+
+class Recorder:
+    """Append request/response pairs to a JSON lines file, credentials redacted.
+
+    The response is kept as body text ('b') so a replay decodes it like a live one.
+    """
+
+    def __init__(self, path):
+        self._path = path
+        self._start = time.monotonic()
+
+    def _write(self, line):
+        with open(self._path, 'a', encoding='utf-8') as f:
+            f.write(line)
+
+    async def record(self, method, url, payload, res):
+        line = json.dumps({
+            't': round(time.monotonic() - self._start, 3),
+            'm': method,
+            'u': url,
+            'q': _redact(payload),
+            'b': json.dumps(_redact(res), ensure_ascii=False, separators=(',', ':')),
+        }, ensure_ascii=False, separators=(',', ':')) + '\n'
+        if _hass:
+            await _hass.async_add_executor_job(self._write, line)
+        else:
+            self._write(line)
+
+
+class ReplayTransport:
+    """Serve recorded response bodies in place of the HTTP client.
+
+    speed scales the recorded gaps between calls, 0 replays without waiting.
+    """
+
+    def __init__(self, path, speed=1.0):
+        with open(path, encoding='utf-8') as f:
+            self._entries = deque(json.loads(line) for line in f if line.strip())
+        self._speed = speed
+        self._last_t = None
+
+    def __len__(self):
+        return len(self._entries)
+
+    async def request(self, method, url, body=None):
+        entry = next((e for e in self._entries if e['m'] == method and e['u'] == url), None)
+        if entry is None:
+            raise RuntimeError(f'no recorded response for {method} {url}')
+        self._entries.remove(entry)
+        if self._speed and self._last_t is not None:
+            await asyncio.sleep(max(entry['t'] - self._last_t, 0) / self._speed)
+        self._last_t = entry['t']
+        return entry['b'].encode()
+
+
+def set_recorder(path):
+    """Start recording API traffic to path, None stops recording."""
+    global _recorder
+    _recorder = Recorder(path) if path else None
+
+def set_replay(path, speed=1.0):
+    """Replay traffic recorded at path instead of calling the cloud, None restores the HTTP client."""
+    global _replay
+    _replay = ReplayTransport(path, speed) if path else None
+
+def _client():
     if _hass:
-        get_client = partial(get_async_client, _hass)
+        return get_async_client(_hass)
+    return httpx.AsyncClient()
+
+async def _post(url, payload, body=None):
+    """POST payload, body is its pre-serialized form when the caller has one cached."""
+    start = time.monotonic()
+    if body is None:
+        body = _dumps(payload)
+    if _replay:
+        content = await _replay.request('POST', url, body)
     else:
-        get_client = httpx.AsyncClient
-    async with get_client() as client:
-        response = await client.post(f'{_domain}{url}', json=payload, headers=_gen_headers())
-        return response.json()
+        async with _client() as client:
+            with profiler.phase('request'):
+                response = await client.post(f'{_domain}{url}', content=body, headers=_gen_headers())
+        content = response.content
+    with profiler.phase('decode'):
+        res = _loads(content)
+    if _recorder:
+        await _recorder.record('POST', url, payload, res)
+    if (tracer := tracing.current.get()) is not None:
+        tracer.exchange('POST', url, time.monotonic() - start, payload, res)
+    return res
 
 async def _get(url):
-    async with get_async_client(_hass) as client:
-        response = await client.get(f'{_domain}{url}', headers=_gen_headers())
-        return response.json()
+    start = time.monotonic()
+    if _replay:
+        content = await _replay.request('GET', url)
+    else:
+        async with _client() as client:
+            with profiler.phase('request'):
+                response = await client.get(f'{_domain}{url}', headers=_gen_headers())
+        content = response.content
+    with profiler.phase('decode'):
+        res = _loads(content)
+    if _recorder:
+        await _recorder.record('GET', url, None, res)
+    if (tracer := tracing.current.get()) is not None:
+        tracer.exchange('GET', url, time.monotonic() - start, None, res)
+    return res
 
 def set_token(token):
-    global _token
+    global _token, _authorization
     _token = token
+    _authorization = (f'Bearer {_token}').strip()
 
 async def login(username, password):
     _LOGGER.debug('login')
@@ -83,7 +209,7 @@ async def rt_login(username, refresh_token):
     })
 
 def parse_auth_res(res):
-    _LOGGER.debug(res)
+    _LOGGER.debug('auth response code %s', res.get('code'))
     if res['code'] == CodeEnum.OK.value:
         user = res['data']['user']
         token = user['token']
@@ -112,18 +238,27 @@ async def req_homes(home_id):
     url = f'api/apphome/homes/{home_id}'
     return await _get(url)
 
-async def req_status(home_id, xkq_list):
+def _status_request(home_id, xkq_codes):
+    key = (home_id, xkq_codes)
+    prepared = _status_bodies.get(key)
+    if prepared is None:
+        payload = {
+            'boxList': [],
+            'deviceListGjy': [],
+            'iuIdList': [],
+            'iuIdListGjy': [],
+            'noNetTip': True,
+            'xkqListGjy': [],
+            'homeId': int(home_id),
+            'xkqList': [{KEY_TS: 0, KEY_CODE: code} for code in xkq_codes],
+        }
+        prepared = _status_bodies[key] = (payload, _dumps(payload))
+    return prepared
+
+async def req_status(home_id, xkq_codes: tuple):
     url = f'api/appstatus/homes/{home_id}/status'
-    return await _post(url, {
-        'boxList': [],
-        'deviceListGjy': [],
-        'iuIdList': [],
-        'iuIdListGjy': [],
-        'noNetTip': True,
-        'xkqListGjy': [],
-        'homeId': int(home_id),
-        'xkqList': xkq_list,
-    })
+    payload, body = _status_request(home_id, xkq_codes)
+    return await _post(url, payload, body)
 
 async def req_cmd(device_info, cmd_dict):
     url = 'api/appcontrol/cmds/multiIuOuCtrl'
@@ -146,7 +281,7 @@ async def req_cmd(device_info, cmd_dict):
         "homeId": device_info[KEY_HOME_ID],
         "ctrlType": "HA420",
     }
-    _LOGGER.debug(payload)
+    _LOGGER.debug('cmd %s: %s', device_info[KEY_CODE], cmd_dict)
     res = await _post(url, payload)
     await asyncio.sleep(3)
     return res
\ No newline at end of file
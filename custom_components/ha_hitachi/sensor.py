@@ -5,14 +5,14 @@ from homeassistant.helpers.device_registry import DeviceInfo
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
 from homeassistant.components.sensor import SensorEntity, SensorStateClass, SensorDeviceClass
-from homeassistant.const import UnitOfTemperature
+from homeassistant.const import UnitOfTemperature, EntityCategory
 
 from . import HitachiConfigEntry
 from .coordinator import Coordinator
-from .const import SensorEnum, KEY_NAME, KEY_CODE, KEY_MAC
+from .outbox import CommandOutbox
+from .const import SensorEnum, AggregateEnum, KEY_NAME, KEY_CODE, KEY_MAC
 
-from .const import DOMAIN, CONF_REFRESH_TOKEN
-from .request import refresh_auth, req_homes, req_status
+from .const import DOMAIN
 
 
 _LOGGER = logging.getLogger(__name__)
@@ -29,13 +29,14 @@ async def async_setup_entry(
 
     devices = coordinator.get_devices()
     entities = []
-    _LOGGER.debug(devices)
     home_ids = list(devices.keys())
     for home_id in home_ids:
         xkq_devices = devices[home_id]['xkqList']
         xkq_list = [HitachiSensor(home_id, xkq[KEY_CODE], sensor_enum, coordinator) for xkq in xkq_devices for sensor_enum in SensorEnum]
         _LOGGER.debug(f"home_id: {home_id} has {len(xkq_list)}")
         entities += xkq_list
+        entities += [HitachiHomeSensor(home_id, aggregate_enum, coordinator) for aggregate_enum in AggregateEnum]
+    entities.append(HitachiOutboxSensor(entry, entry.runtime_data.outbox))
 
     _LOGGER.debug(f"add entities: {len(entities)}")
     async_add_entities(
@@ -54,6 +55,8 @@ class HitachiSensor(CoordinatorEntity[Coordinator], SensorEntity):
         self._coordinator = coordinator
         self._home_id = home_id
         self._xkq_code = xkq_code
+        self._dev = None
+        self._last_update_success = coordinator.last_update_success
         self._key = key
 
         self._attr_device_class = SensorDeviceClass.TEMPERATURE
@@ -89,12 +92,109 @@ class HitachiSensor(CoordinatorEntity[Coordinator], SensorEntity):
     @callback
     def _handle_coordinator_update(self) -> None:
         """Handle data update."""
+        # snapshots replace changed records, an identical record means nothing to render
+        if (self._coordinator.get_data(self._home_id, self._xkq_code) is self._dev
+                and self._coordinator.last_update_success == self._last_update_success):
+            self._coordinator.skip_write()
+            return
+        self._last_update_success = self._coordinator.last_update_success
         self._update_state()
-        self.async_write_ha_state()
+        self._coordinator.schedule_write(self)
 
     def _update_state(self):
         dev = self._coordinator.get_data(
             self._home_id, self._xkq_code
         )
+        self._dev = dev
         if dev:
-            self._attr_native_value = dev[self._key.value]
+            self._attr_native_value = dev.get(self._key.value)
+
+
+AGGREGATE_NAMES = {
+    AggregateEnum.temp_mean: '平均环境温度',
+    AggregateEnum.temp_min: '最低环境温度',
+    AggregateEnum.temp_max: '最高环境温度',
+    AggregateEnum.delta_t_mean: '平均供回水温差',
+    AggregateEnum.on: '运行数',
+    AggregateEnum.off: '关机数',
+    AggregateEnum.cold: '制冷数',
+    AggregateEnum.heat: '制热数',
+    AggregateEnum.floor_heat: '地暖数',
+}
+
+AGGREGATE_TEMPS = {
+    AggregateEnum.temp_mean, AggregateEnum.temp_min, AggregateEnum.temp_max, AggregateEnum.delta_t_mean,
+}
+
+class HitachiHomeSensor(CoordinatorEntity[Coordinator], SensorEntity):
+    """Home level aggregate computed by the coordinator once per poll."""
+
+    def __init__(self, home_id: str, key: AggregateEnum, coordinator: Coordinator):
+        super().__init__(coordinator)
+
+        self._coordinator = coordinator
+        self._home_id = home_id
+        self._key = key
+        self._aggregates = None
+        self._last_update_success = coordinator.last_update_success
+
+        if key in AGGREGATE_TEMPS:
+            self._attr_native_unit_of_measurement = UnitOfTemperature.CELSIUS
+            if key != AggregateEnum.delta_t_mean:
+                self._attr_device_class = SensorDeviceClass.TEMPERATURE
+        self._attr_state_class = SensorStateClass.MEASUREMENT
+
+        home_name = coordinator.get_home_name(home_id)
+        self._attr_name = home_name + AGGREGATE_NAMES[key]
+        self._attr_device_info = DeviceInfo(
+            identifiers={(DOMAIN, f"hitachi_home_{home_id}")},
+            name=home_name,
+            manufacturer="Hitachi, Ltd.",
+            model='home',
+        )
+        self._attr_unique_id = f"hitachi-home-{home_id}-{key.name}"
+
+        self._update_state()
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Handle data update."""
+        if (self._coordinator.get_aggregates(self._home_id) is self._aggregates
+                and self._coordinator.last_update_success == self._last_update_success):
+            self._coordinator.skip_write()
+            return
+        self._last_update_success = self._coordinator.last_update_success
+        self._update_state()
+        self._coordinator.schedule_write(self)
+
+    def _update_state(self):
+        aggregates = self._coordinator.get_aggregates(self._home_id)
+        self._aggregates = aggregates
+        if aggregates:
+            self._attr_native_value = aggregates[self._key]
+
+
+class HitachiOutboxSensor(SensorEntity):
+    """Number of commands waiting in the outbox for the cloud to come back."""
+
+    _attr_should_poll = False
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_state_class = SensorStateClass.MEASUREMENT
+
+    def __init__(self, entry: HitachiConfigEntry, outbox: CommandOutbox):
+        self._outbox = outbox
+        self._attr_name = '待发送指令'
+        self._attr_unique_id = f"hitachi-{entry.entry_id}-outbox"
+        self._attr_device_info = DeviceInfo(
+            identifiers={(DOMAIN, f"hitachi_{entry.entry_id}")},
+            name=entry.title,
+            manufacturer="Hitachi, Ltd.",
+            model='account',
+        )
+
+    async def async_added_to_hass(self) -> None:
+        self.async_on_remove(self._outbox.async_add_listener(self.async_write_ha_state))
+
+    @property
+    def native_value(self) -> int:
+        return self._outbox.depth
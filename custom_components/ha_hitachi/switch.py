@@ -12,8 +12,7 @@ from . import HitachiConfigEntry
 from .coordinator import Coordinator
 from .const import SwitchEnum, KEY_NAME, KEY_CODE, KEY_MAC, KEY_MODE, KEY_STATE, ModeEnum
 
-from .const import DOMAIN, CONF_REFRESH_TOKEN
-from .request import refresh_auth, req_homes, req_status
+from .const import DOMAIN
 
 
 _LOGGER = logging.getLogger(__name__)
@@ -30,7 +29,6 @@ async def async_setup_entry(
 
     devices = coordinator.get_devices()
     entities = []
-    _LOGGER.debug(devices)
     home_ids = list(devices.keys())
     for home_id in home_ids:
         xkq_devices = devices[home_id]['xkqList']
@@ -55,6 +53,8 @@ class HitachiSwitch(CoordinatorEntity[Coordinator], SwitchEntity):
         self._coordinator = coordinator
         self._home_id = home_id
         self._xkq_code = xkq_code
+        self._dev = None
+        self._last_update_success = coordinator.last_update_success
         self._key = key
 
         self._attr_device_class = SwitchDeviceClass.SWITCH
@@ -93,14 +93,22 @@ class HitachiSwitch(CoordinatorEntity[Coordinator], SwitchEntity):
     @callback
     def _handle_coordinator_update(self) -> None:
         """Handle data update."""
+        # snapshots replace changed records, an identical record means nothing to render
+        if (self._coordinator.get_data(self._home_id, self._xkq_code) is self._dev
+                and self._coordinator.last_update_success == self._last_update_success):
+            self._coordinator.skip_write()
+            return
+        self._last_update_success = self._coordinator.last_update_success
         self._update_state()
-        self.async_write_ha_state()
+        self._coordinator.schedule_write(self)
 
     def _update_state(self):
         dev = self._coordinator.get_data(
             self._home_id, self._xkq_code
         )
-        if dev:
+        self._dev = dev
+        # platforms are set up while the first poll is still running
+        if dev and KEY_STATE in dev:
             available = True
             if self._key == SwitchEnum.eco or self._key == SwitchEnum.silent:
                 available = dev[KEY_STATE] != 0
@@ -118,10 +126,9 @@ class HitachiSwitch(CoordinatorEntity[Coordinator], SwitchEntity):
 
     async def _async_control(self, value):
         _LOGGER.debug('control')
-        res = await self._coordinator.control(self._home_id, self._xkq_code, {
+        await self._coordinator.control(self._home_id, self._xkq_code, {
             self._key.value: value,
         })
-        _LOGGER.debug(res)
         await self._coordinator.async_refresh()
 
     async def async_turn_on(self, **kwargs: Any) -> None:
@@ -0,0 +1,93 @@
+"""Structured trace of API exchanges and polls.
+
+Each config entry owns a Tracer. Exchanges and poll timings are kept in bounded
+ring buffers and exported through the entry's diagnostics; request.py records
+into whichever tracer the caller activated with use(). Log messages are only
+built when debug logging is enabled, and routine polls are sampled instead of
+dumping the device tree every interval.
+"""
+
+import logging
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from .const import KEY_CODE, KEY_STATE
+
+_LOGGER = logging.getLogger(__name__)
+
+BUFFER_SIZE = 50
+# log one in every POLL_SAMPLE routine polls
+POLL_SAMPLE = 30
+
+
+class _Lazy:
+    """Build a log argument only when the record is actually formatted."""
+
+    def __init__(self, fn, *args):
+        self._fn = fn
+        self._args = args
+
+    def __str__(self):
+        return str(self._fn(*self._args))
+
+
+def _summarize(devices):
+    return {
+        home_id: {xkq[KEY_CODE]: xkq.get(KEY_STATE) for xkq in home['xkqList']}
+        for home_id, home in devices.items()
+    }
+
+
+class Tracer:
+
+    def __init__(self, size: int = BUFFER_SIZE):
+        self._exchanges = deque(maxlen=size)
+        self._polls = deque(maxlen=size)
+        self._poll_count = 0
+
+    def exchange(self, method: str, url: str, elapsed: float, payload, res):
+        """Record one API call. payload and res are kept by reference, redact on export."""
+        code = res.get('code') if isinstance(res, dict) else None
+        self._exchanges.append({
+            'ts': time.time(),
+            'method': method,
+            'url': url,
+            'ms': round(elapsed * 1000, 1),
+            'code': code,
+            'request': payload,
+            'response': res,
+        })
+        _LOGGER.debug('%s %s -> %s in %.0fms', method, url, code, elapsed * 1000)
+
+    def poll(self, elapsed: float, devices: dict):
+        self._poll_count += 1
+        self._polls.append({
+            'ts': time.time(),
+            'ms': round(elapsed * 1000, 1),
+            'homes': len(devices),
+            'xkqs': sum(len(home['xkqList']) for home in devices.values()),
+        })
+        if self._poll_count % POLL_SAMPLE == 1 and _LOGGER.isEnabledFor(logging.DEBUG):
+            _LOGGER.debug('poll #%d in %.0fms: %s', self._poll_count, elapsed * 1000, _Lazy(_summarize, devices))
+
+    def as_dict(self) -> dict:
+        return {
+            'poll_count': self._poll_count,
+            'polls': list(self._polls),
+            'exchanges': list(self._exchanges),
+        }
+
+
+current: ContextVar[Tracer | None] = ContextVar('hitachi_tracer', default=None)
+
+
+@contextmanager
+def use(tracer: Tracer | None):
+    """Record API exchanges made inside the block into tracer, or nowhere for None."""
+    token = current.set(tracer)
+    try:
+        yield
+    finally:
+        current.reset(token)